@@ -1,49 +1,74 @@
 """Configuration management for MOTD bot."""
 import os
-from dotenv import load_dotenv
+from functools import cache
 
-# Load environment variables
-load_dotenv()
 
+@cache
+def _load_env():
+    """Load environment variables from .env exactly once, on first access."""
+    from dotenv import load_dotenv
+    load_dotenv()
 
-class Config:
-    """Bot configuration from environment variables."""
 
+# Environment-backed settings: attribute -> (converter, default)
+# Required settings have no default and resolve to None when unset.
+_ENV_SETTINGS = {
     # OpenAI
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    'OPENAI_API_KEY': (str, None),
 
     # Telegram
-    TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-    TELEGRAM_CHANNEL_ID = os.getenv('TELEGRAM_CHANNEL_ID')
+    'TELEGRAM_BOT_TOKEN': (str, None),
+    'TELEGRAM_CHANNEL_ID': (str, None),
 
     # Scheduling
-    DAILY_POST_HOUR = int(os.getenv('DAILY_POST_HOUR', '9'))
-    DAILY_POST_MINUTE = int(os.getenv('DAILY_POST_MINUTE', '0'))
-    TIMEZONE = os.getenv('TIMEZONE', 'UTC')
+    'DAILY_POST_HOUR': (int, '9'),
+    'DAILY_POST_MINUTE': (int, '0'),
+    'TIMEZONE': (str, 'UTC'),
 
     # Testing
-    DRY_RUN = os.getenv('DRY_RUN', 'false').lower() == 'true'
+    'DRY_RUN': (lambda v: v.lower() == 'true', 'false'),
 
     # Database
-    DATABASE_PATH = os.getenv('DATABASE_PATH', 'motd.db')
-
-    # Data files
-    PERSONALITY_FILE = 'data/kaine_personality.md'
-    POSTS_FILE = 'data/mrkainez_posts.json'
-
-    # Message history
-    HISTORY_DAYS = 365
+    'DATABASE_PATH': (str, 'motd.db'),
 
     # Similarity threshold for message uniqueness (0-1)
     # 0.85 means reject messages that are >85% similar to recent messages
-    SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', '0.85'))
+    'SIMILARITY_THRESHOLD': (float, '0.85'),
 
     # Number of generation attempts before accepting best message
-    MAX_GENERATION_ATTEMPTS = int(os.getenv('MAX_GENERATION_ATTEMPTS', '5'))
+    'MAX_GENERATION_ATTEMPTS': (int, '5'),
 
     # Days of history to check for similarity (default 90)
     # Lower = faster checks, higher = stricter uniqueness over longer period
-    SIMILARITY_CHECK_DAYS = int(os.getenv('SIMILARITY_CHECK_DAYS', '90'))
+    'SIMILARITY_CHECK_DAYS': (int, '90'),
+}
+
+
+class _ConfigMeta(type):
+    """Resolves environment-backed settings lazily and memoizes them."""
+
+    def __getattr__(cls, name):
+        try:
+            convert, default = _ENV_SETTINGS[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        _load_env()
+        raw = os.getenv(name, default)
+        value = convert(raw) if raw is not None else None
+        # Memoize on the class so later accesses are plain attribute lookups
+        setattr(cls, name, value)
+        return value
+
+
+class Config(metaclass=_ConfigMeta):
+    """Bot configuration from environment variables."""
+
+    # Data files
+    PERSONALITY_FILE = 'data/kaine_personality.md'
+    POSTS_FILE = 'data/mrkainez_posts.json'
+
+    # Message history
+    HISTORY_DAYS = 365
 
     @classmethod
     def validate(cls):
@@ -1,12 +1,38 @@
 """Database management for message history."""
+from __future__ import annotations
+
 import sqlite3
-import hashlib
 import pickle
-import pytz
+import xxhash
 from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
+from typing import TYPE_CHECKING, Optional, List, Tuple
 from config import Config
 
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _today_date() -> str:
+    """Today's date string in the configured timezone."""
+    import pytz  # deferred: keeps module import light for CLI paths
+    return datetime.now(pytz.timezone(Config.TIMEZONE)).strftime('%Y-%m-%d')
+
+
+def _cutoff_date(days: int) -> str:
+    """Date string N days back in the configured timezone."""
+    import pytz  # deferred: keeps module import light for CLI paths
+    tz = pytz.timezone(Config.TIMEZONE)
+    return (datetime.now(tz) - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def hash_content(content: str) -> str:
+    """Generate hash of message content for duplicate detection.
+
+    The hash is a dedup key, not a security boundary, so xxh3 (SIMD-
+    accelerated, much faster than SHA-256 on short inputs) replaces hashlib.
+    """
+    return xxhash.xxh3_128_hexdigest(content.encode())
+
 
 class MessageDatabase:
     """Manages message history in SQLite database."""
@@ -15,14 +41,41 @@ class MessageDatabase:
         """Initialize database connection."""
         self.db_path = db_path or Config.DATABASE_PATH
         self.conn = None
+        self._emb_matrix = None
+        self._emb_contents = []
+        self._emb_days = None
+        self._emb_dirty = True
+        self._msg_cache = {}
+        self._hash_set = None
         self._connect()
         self._create_tables()
+        self._run_migrations()
 
     def _connect(self):
-        """Connect to database."""
-        self.conn = sqlite3.connect(self.db_path)
+        """Connect to database with performance-tuned PRAGMAs."""
+        # isolation_level=None puts sqlite3 in autocommit mode; writes are
+        # wrapped in explicit BEGIN/COMMIT so each batch costs one fsync
+        # cached_statements keeps the compiled form of every hot query
+        # resident, so repeated calls skip SQL re-preparation
+        self.conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=128
+        )
         self.conn.row_factory = sqlite3.Row
 
+        # WAL avoids the fsync-heavy rollback journal; a 20 MB page cache and
+        # mmap keep the whole messages table memory-resident for reads
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA cache_size=-20000')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA mmap_size=268435456')
+        # Don't zero-fill freed pages on DELETE; with ~3 KB embedding blobs
+        # per row that's pointless write I/O for this data
+        self.conn.execute('PRAGMA secure_delete=OFF')
+
     def _create_tables(self):
         """Create necessary tables if they don't exist."""
         cursor = self.conn.cursor()
@@ -37,34 +90,102 @@ class MessageDatabase:
                 UNIQUE(date)
             )
         ''')
+        # Covering DESC index: every hot read is
+        # WHERE date >= ? ORDER BY date DESC on content, so this serves them
+        # as an index-only scan with no sort step and no trips into the
+        # embedding-blob row heap. It subsumes the old idx_date.
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_date ON messages(date)
+            CREATE INDEX IF NOT EXISTS idx_date_desc ON messages(date DESC, content)
         ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_date')
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_hash ON messages(message_hash)
         ''')
-        self.conn.commit()
+
+    def _run_migrations(self):
+        """Staged, one-time data migrations, tracked via PRAGMA user_version.
+
+        v0 -> v1: legacy pickled float lists become raw float32 bytes
+        v1 -> v2: float32 embeddings become L2-normalized float16
+        v2 -> v3: SHA-256 content hashes (64 hex chars) become xxh3-128
+        """
+        import numpy as np
+
+        cursor = self.conn.cursor()
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version >= 3:
+            return
+
+        if version < 2:
+            cursor.execute('SELECT id, embedding FROM messages WHERE embedding IS NOT NULL')
+            rows = cursor.fetchall()
+            self.conn.execute('BEGIN IMMEDIATE')
+            for row in rows:
+                blob = row['embedding']
+                if version < 1 and blob[:1] == b'\x80':
+                    # Pickle streams start with the PROTO opcode (0x80)
+                    vector = np.asarray(pickle.loads(blob), dtype=np.float32)
+                else:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    vector = vector / norm
+                self.conn.execute(
+                    'UPDATE messages SET embedding = ? WHERE id = ?',
+                    (vector.astype(np.float16).tobytes(), row['id'])
+                )
+            cursor.execute('PRAGMA user_version = 2')
+            self.conn.execute('COMMIT')
+
+        # Rehash rows still carrying 64-char SHA-256 digests
+        cursor.execute('SELECT id, content FROM messages WHERE length(message_hash) != 32')
+        rows = cursor.fetchall()
+        self.conn.execute('BEGIN IMMEDIATE')
+        for row in rows:
+            self.conn.execute(
+                'UPDATE messages SET message_hash = ? WHERE id = ?',
+                (hash_content(row['content']), row['id'])
+            )
+        cursor.execute('PRAGMA user_version = 3')
+        self.conn.execute('COMMIT')
 
     def _hash_content(self, content: str) -> str:
         """Generate hash of message content."""
-        return hashlib.sha256(content.encode()).hexdigest()
+        return hash_content(content)
 
-    def save_message(self, date: str, content: str, embedding: List[float] = None) -> bool:
-        """Save a message to database with optional embedding."""
+    def save_message(self, date: str, content: str, embedding: np.ndarray = None) -> bool:
+        """Save a message to database with optional embedding (ndarray or list)."""
         try:
             cursor = self.conn.cursor()
             message_hash = self._hash_content(content)
 
-            # Serialize embedding if provided
-            embedding_blob = pickle.dumps(embedding) if embedding else None
+            # Serialize embedding as L2-normalized float16 bytes if provided:
+            # half the blob bandwidth of float32, and similarity ordering at
+            # the 0.85 threshold is unaffected by the quantization
+            if embedding is not None:
+                import numpy as np
+                vector = np.asarray(embedding, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    vector = vector / norm
+                embedding_blob = vector.astype(np.float16).tobytes()
+            else:
+                embedding_blob = None
 
+            self.conn.execute('BEGIN IMMEDIATE')
             cursor.execute(
                 'INSERT OR REPLACE INTO messages (date, content, message_hash, embedding) VALUES (?, ?, ?, ?)',
                 (date, content, message_hash, embedding_blob)
             )
-            self.conn.commit()
+            self.conn.execute('COMMIT')
+            self._emb_dirty = True
+            self._msg_cache.clear()
+            if self._hash_set is not None:
+                self._hash_set.add(message_hash)
             return True
         except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
             print(f"Database error saving message: {e}")
             return False
 
@@ -75,29 +196,56 @@ class MessageDatabase:
         row = cursor.fetchone()
         return row['content'] if row else None
 
-    def get_today_message(self) -> Optional[str]:
-        """Get today's message if it exists (timezone-aware)."""
-        tz = pytz.timezone(Config.TIMEZONE)
-        today = datetime.now(tz).strftime('%Y-%m-%d')
-        return self.get_message_by_date(today)
+    def get_today_message(self, date: str = None) -> Optional[str]:
+        """Get today's message if it exists (timezone-aware).
+
+        Callers that already computed today's date string can pass it to
+        skip the repeated timezone lookup.
+        """
+        return self.get_message_by_date(date or _today_date())
 
-    def get_recent_messages(self, days: int = None) -> List[str]:
-        """Get messages from the last N days (timezone-aware)."""
+    def get_recent_messages(self, days: int = None, limit: int = None) -> List[str]:
+        """Get messages from the last N days (timezone-aware).
+
+        Pass limit to cap the result server-side (e.g. prompt context only
+        uses a handful of rows); omit it for the full history.
+        """
         days = days or Config.HISTORY_DAYS
-        tz = pytz.timezone(Config.TIMEZONE)
-        cutoff_date = (datetime.now(tz) - timedelta(days=days)).strftime('%Y-%m-%d')
+        cutoff_date = _cutoff_date(days)
+
+        # Memoized per (cutoff, limit); keying on the cutoff date means the
+        # cache rolls over naturally at midnight, and writes clear it
+        cache_key = (cutoff_date, limit)
+        cached = self._msg_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         cursor = self.conn.cursor()
-        cursor.execute(
-            'SELECT content FROM messages WHERE date >= ? ORDER BY date DESC',
-            (cutoff_date,)
-        )
-        return [row['content'] for row in cursor.fetchall()]
+        if limit is not None:
+            cursor.execute(
+                'SELECT content FROM messages WHERE date >= ? ORDER BY date DESC LIMIT ?',
+                (cutoff_date, limit)
+            )
+        else:
+            cursor.execute(
+                'SELECT content FROM messages WHERE date >= ? ORDER BY date DESC',
+                (cutoff_date,)
+            )
+        results = [row['content'] for row in cursor.fetchall()]
+        self._msg_cache[cache_key] = results
+        return results
+
+    def get_recent_embeddings(self, days: int = None) -> List[Tuple[str, np.ndarray]]:
+        """Get messages with embeddings from the last N days (timezone-aware).
+
+        Embeddings come back as contiguous float32 ndarrays decoded straight
+        from the stored blobs — never lists of boxed Python floats — so a
+        1536-dim vector costs 6 KB instead of ~40 KB of PyFloat objects.
+        """
+        import numpy as np
 
-    def get_recent_embeddings(self, days: int = None) -> List[Tuple[str, List[float]]]:
-        """Get messages with embeddings from the last N days (timezone-aware)."""
         days = days or Config.HISTORY_DAYS
-        tz = pytz.timezone(Config.TIMEZONE)
-        cutoff_date = (datetime.now(tz) - timedelta(days=days)).strftime('%Y-%m-%d')
+        cutoff_date = _cutoff_date(days)
         cursor = self.conn.cursor()
         cursor.execute(
             'SELECT content, embedding FROM messages WHERE date >= ? AND embedding IS NOT NULL ORDER BY date DESC',
@@ -106,30 +254,154 @@ class MessageDatabase:
         results = []
         for row in cursor.fetchall():
             content = row['content']
-            embedding = pickle.loads(row['embedding']) if row['embedding'] else None
-            if embedding:
+            embedding = (
+                np.frombuffer(row['embedding'], dtype=np.float16).astype(np.float32)
+                if row['embedding'] else None
+            )
+            if embedding is not None and embedding.size > 0:
                 results.append((content, embedding))
         return results
 
-    def is_duplicate(self, content: str) -> bool:
-        """Check if content is too similar to existing messages."""
-        message_hash = self._hash_content(content)
+    def _rebuild_matrix_cache(self, recent: List[Tuple[str, np.ndarray]], days: int):
+        """Stack (content, embedding) pairs into the cached normalized matrix."""
+        import numpy as np
+
+        self._emb_contents = [content for content, _ in recent]
+        if recent:
+            # Fill a preallocated buffer; assigning rows upcasts in place
+            # without a per-row temporary
+            matrix = np.empty((len(recent), recent[0][1].shape[0]), dtype=np.float32)
+            for i, (_, embedding) in enumerate(recent):
+                matrix[i] = embedding
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        self._emb_matrix = matrix
+        self._emb_days = days
+        self._emb_dirty = False
+
+    def get_embedding_matrix(self, days: int = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Get recent messages as (contents, matrix) where matrix is an (N, d)
+        L2-normalized float32 array of their embeddings.
+
+        The matrix is cached in memory and only rebuilt after a write
+        (save_message/cleanup_old_messages) or when a different day range
+        is requested, so warm-path similarity checks skip SQLite entirely.
+        """
+        days = days or Config.HISTORY_DAYS
+        if self._emb_dirty or self._emb_days != days:
+            import numpy as np
+
+            # Rebuild straight from the blobs: zero-copy float16 views of
+            # each row, assigned into a preallocated float32 matrix, with no
+            # intermediate per-row float32 arrays
+            cursor = self.conn.cursor()
+            cursor.execute(
+                'SELECT content, embedding FROM messages WHERE date >= ? AND embedding IS NOT NULL ORDER BY date DESC',
+                (_cutoff_date(days),)
+            )
+            recent = []
+            for row in cursor.fetchall():
+                view = np.frombuffer(row['embedding'], dtype=np.float16)
+                if view.size > 0:
+                    recent.append((row['content'], view))
+            self._rebuild_matrix_cache(recent, days)
+        return self._emb_contents, self._emb_matrix
+
+    def get_recent(self, days_text: int = None, days_emb: int = None,
+                   text_limit: int = None) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Get recent message texts plus the (contents, matrix) embedding cache,
+        fused into a single SQL query.
+
+        When the embedding cache is warm only the cheap text query runs; when
+        it is dirty, one SELECT over the wider date range feeds both results
+        instead of fetching and decoding the overlapping rows twice.
+
+        Returns:
+            Tuple of (messages, emb_contents, emb_matrix)
+        """
+        import numpy as np
+
+        days_text = days_text or Config.HISTORY_DAYS
+        days_emb = days_emb or Config.HISTORY_DAYS
+        if not self._emb_dirty and self._emb_days == days_emb:
+            return (self.get_recent_messages(days_text, limit=text_limit),
+                    self._emb_contents, self._emb_matrix)
+
+        cutoff_text = _cutoff_date(days_text)
+        cutoff_emb = _cutoff_date(days_emb)
         cursor = self.conn.cursor()
-        cursor.execute('SELECT COUNT(*) as count FROM messages WHERE message_hash = ?', (message_hash,))
-        result = cursor.fetchone()
-        return result['count'] > 0
+        cursor.execute(
+            'SELECT date, content, embedding FROM messages WHERE date >= ? ORDER BY date DESC',
+            (min(cutoff_text, cutoff_emb),)
+        )
+
+        messages = []
+        recent = []
+        for row in cursor.fetchall():
+            if row['date'] >= cutoff_text and (text_limit is None or len(messages) < text_limit):
+                messages.append(row['content'])
+            if row['date'] >= cutoff_emb and row['embedding']:
+                embedding = np.frombuffer(row['embedding'], dtype=np.float16).astype(np.float32)
+                if embedding.size > 0:
+                    recent.append((row['content'], embedding))
+
+        self._rebuild_matrix_cache(recent, days_emb)
+        return messages, self._emb_contents, self._emb_matrix
+
+    def get_recent_hashes(self, days: int = None) -> set:
+        """Get the set of content hashes from the last N days (timezone-aware).
+
+        Lets callers run exact-duplicate checks in O(1) Python without a SQL
+        round trip per candidate.
+        """
+        days = days or Config.HISTORY_DAYS
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'SELECT message_hash FROM messages WHERE date >= ?',
+            (_cutoff_date(days),)
+        )
+        return {row['message_hash'] for row in cursor.fetchall()}
+
+    def _all_hashes(self) -> set:
+        """All content hashes, loaded once and kept in sync by writes.
+
+        At this table's size (<= HISTORY_DAYS rows) an exact set is smaller
+        and faster than a Bloom filter would be, with no false positives.
+        """
+        if self._hash_set is None:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT message_hash FROM messages')
+            self._hash_set = {row['message_hash'] for row in cursor.fetchall()}
+        return self._hash_set
+
+    def is_duplicate(self, content: str) -> bool:
+        """Check if identical content already exists (in-memory set lookup)."""
+        return self._hash_content(content) in self._all_hashes()
 
     def cleanup_old_messages(self, days: int = None):
         """Delete messages older than specified days (timezone-aware)."""
         days = days or Config.HISTORY_DAYS
-        tz = pytz.timezone(Config.TIMEZONE)
-        cutoff_date = (datetime.now(tz) - timedelta(days=days)).strftime('%Y-%m-%d')
+        cutoff_date = _cutoff_date(days)
         cursor = self.conn.cursor()
+        self.conn.execute('BEGIN IMMEDIATE')
         cursor.execute('DELETE FROM messages WHERE date < ?', (cutoff_date,))
         deleted = cursor.rowcount
-        self.conn.commit()
+        self.conn.execute('COMMIT')
+        if deleted:
+            self._emb_dirty = True
+            self._msg_cache.clear()
+            # Deleted rows free their content for reuse, so rebuild lazily
+            self._hash_set = None
         return deleted
 
+    def vacuum(self):
+        """Reclaim free pages. Expensive, so callers run this on a schedule
+        (weekly) rather than after every cleanup."""
+        self.conn.execute('VACUUM')
+
     def get_message_count(self) -> int:
         """Get total number of messages in database."""
         cursor = self.conn.cursor()
@@ -1,68 +1,95 @@
 """OpenAI-powered message generation for Mr. Kaine MOTD."""
+from __future__ import annotations
+
+import asyncio
 import json
-import numpy as np
-from typing import List, Optional, Tuple
-from openai import OpenAI
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from config import Config
+from database import hash_content
 
+if TYPE_CHECKING:
+    import numpy as np
 
-class MessageGenerator:
-    """Generates daily messages using OpenAI."""
 
-    def __init__(self):
-        """Initialize OpenAI client."""
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        self.personality = self._load_personality()
-        self.posts_context = self._load_posts_context()
+def _max_cosine(matrix: np.ndarray, vector: np.ndarray) -> float:
+    """Max cosine similarity between a unit vector and pre-normalized rows.
 
-    def _load_personality(self) -> str:
-        """Load personality guidelines from file."""
-        try:
-            with open(Config.PERSONALITY_FILE, 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            print(f"Warning: {Config.PERSONALITY_FILE} not found")
-            return ""
-
-    def _load_posts_context(self) -> str:
-        """Load and format sample posts for context."""
-        try:
-            with open(Config.POSTS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                posts = data.get('posts', [])
-
-                # Sample posts to reduce context size (every 10th post)
-                sample_posts = posts[::10][:50]
-
-                context = "Sample posts from Mr. Kaine's Telegram history:\n\n"
-                for post in sample_posts:
-                    content = post.get('content', '').strip()
-                    date = post.get('date', '')
-                    if content and len(content) > 20:  # Skip very short posts
-                        context += f"[{date}] {content}\n\n"
-
-                return context
-        except FileNotFoundError:
-            print(f"Warning: {Config.POSTS_FILE} not found")
-            return ""
-        except json.JSONDecodeError:
-            print(f"Warning: Could not parse {Config.POSTS_FILE}")
-            return ""
+    One contiguous float32 matrix-vector product: BLAS already runs this
+    SIMD-vectorized (and threaded for large N), so there is nothing left for
+    a JIT kernel to win at the row counts this bot sees (N <= HISTORY_DAYS).
+    """
+    scores = matrix @ vector
+    return float(scores[int(scores.argmax())])
 
-    def generate_message(self, previous_messages: List[str] = None) -> str:
-        """
-        Generate a new daily message.
 
-        Args:
-            previous_messages: List of recent messages to avoid repetition
+# Validation patterns, compiled once (matched against lowercased text)
+_FORBIDDEN_THANKS = re.compile(r'node operator|pillar operator')
+_THANKS_KEYWORDS = re.compile(r'thanks|thank|appreciation|respect|shout')
 
-        Returns:
-            Generated message string
-        """
-        previous_messages = previous_messages or []
 
-        # Build the prompt
-        system_prompt = f"""You are Mr. Kaine, creator of Zenon Network.
+@lru_cache(maxsize=None)
+def _read_personality(path: str) -> str:
+    """Read personality guidelines, cached per path for the process lifetime."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        print(f"Warning: {path} not found")
+        return ""
+
+
+@lru_cache(maxsize=None)
+def _read_posts_context(path: str) -> str:
+    """Read and format sample posts, cached per path for the process lifetime."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            posts = data.get('posts', [])
+
+            # Sample posts to reduce context size (every 10th post)
+            sample_posts = posts[::10][:50]
+
+            context = "Sample posts from Mr. Kaine's Telegram history:\n\n"
+            for post in sample_posts:
+                content = post.get('content', '').strip()
+                date = post.get('date', '')
+                if content and len(content) > 20:  # Skip very short posts
+                    context += f"[{date}] {content}\n\n"
+
+            return context
+    except FileNotFoundError:
+        print(f"Warning: {path} not found")
+        return ""
+    except json.JSONDecodeError:
+        print(f"Warning: Could not parse {path}")
+        return ""
+
+
+class MessageGenerator:
+    """Generates daily messages using OpenAI."""
+
+    def __init__(self):
+        """Initialize OpenAI client."""
+        # Deferred import: the openai package costs ~200 ms and isn't needed
+        # by callers that never construct a generator
+        from openai import OpenAI
+        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.personality = _read_personality(Config.PERSONALITY_FILE)
+        self.posts_context = _read_posts_context(Config.POSTS_FILE)
+        # Pre-truncated prompt fragment, so the retry loop doesn't reslice
+        # a 3 KB substring on every attempt
+        self._posts_context_head = self.posts_context[:3000]
+        self._cached_matrix = None
+        self._cached_source = None
+        self._async_client = None
+
+        # Prompts are immutable after load, so build them once instead of
+        # re-interpolating hundreds of bytes on every retry attempt. The user
+        # prompt is split around its one dynamic slot (recent messages);
+        # plain concatenation avoids str.format choking on braces in posts.
+        self._system_prompt = f"""You are Mr. Kaine, creator of Zenon Network.
 
 {self.personality}
 
@@ -86,20 +113,50 @@ Thanks to [specific contributor types]. [Genuine appreciation].
 
 CRITICAL: Use a blank line to separate the two parts."""
 
-        user_prompt = f"""Context from your Telegram posts:
+        self._user_prompt_prefix = f"""Context from your Telegram posts:
 
-{self.posts_context[:3000]}
+{self._posts_context_head}
 
 Recent messages to avoid repetition:
-{self._format_recent_messages(previous_messages)}
+"""
+        self._user_prompt_suffix = (
+            "\n\nGenerate today's message of the day following the two-part "
+            "format with a blank line separator."
+        )
+
+    def _get_async_client(self):
+        """Lazily-created AsyncOpenAI client, shared across async calls."""
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+        return self._async_client
+
+    def _build_user_prompt(self, previous_messages: List[str]) -> str:
+        """Fill the precomputed template's single dynamic slot."""
+        return (
+            self._user_prompt_prefix
+            + self._format_recent_messages(previous_messages)
+            + self._user_prompt_suffix
+        )
 
-Generate today's message of the day following the two-part format with a blank line separator."""
+    def generate_message(self, previous_messages: List[str] = None) -> str:
+        """
+        Generate a new daily message.
+
+        Args:
+            previous_messages: List of recent messages to avoid repetition
+
+        Returns:
+            Generated message string
+        """
+        previous_messages = previous_messages or []
+        user_prompt = self._build_user_prompt(previous_messages)
 
         try:
             response = self.client.chat.completions.create(
                 model="gpt-4",
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": self._system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.8,
@@ -122,7 +179,7 @@ Generate today's message of the day following the two-part format with a blank l
         formatted = "\n---\n".join(f"- {msg}" for msg in recent)
         return formatted
 
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str) -> np.ndarray:
         """
         Get embedding vector for text using OpenAI.
 
@@ -130,39 +187,79 @@ Generate today's message of the day following the two-part format with a blank l
             text: Text to embed
 
         Returns:
-            List of floats representing the embedding vector
+            float32 ndarray representing the embedding vector
+        """
+        return self.get_embeddings_batch([text])[0]
+
+    def get_embeddings_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Get embedding vectors for several texts in a single API call.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of L2-normalized float32 ndarrays, one per input text, in
+            input order. Normalizing once here means downstream similarity
+            is a plain dot product.
         """
+        import numpy as np
+
         try:
             response = self.client.embeddings.create(
                 model="text-embedding-3-small",
-                input=text
+                input=texts
             )
-            return response.data[0].embedding
+            vectors = []
+            for item in response.data:
+                vector = np.asarray(item.embedding, dtype=np.float32)
+                vectors.append(vector / np.linalg.norm(vector))
+            return vectors
         except Exception as e:
             print(f"Error getting embedding: {e}")
             raise
 
-    def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
+    def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
-        Calculate cosine similarity between two vectors.
+        Calculate cosine similarity between two L2-normalized vectors.
+
+        Embeddings are normalized once at ingestion (get_embeddings_batch /
+        save_message), so cosine reduces to a single dot product here.
 
         Args:
-            vec1: First embedding vector
-            vec2: Second embedding vector
+            vec1: First embedding vector (unit norm)
+            vec2: Second embedding vector (unit norm)
 
         Returns:
             Similarity score between 0 and 1 (1 = identical, 0 = completely different)
         """
-        v1 = np.array(vec1)
-        v2 = np.array(vec2)
-        return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+        import numpy as np
+        return float(np.dot(vec1, vec2))
+
+    def _build_matrix(self, recent_embeddings: List[Tuple[str, np.ndarray]]) -> np.ndarray:
+        """
+        Stack recent embeddings into a pre-normalized (N, d) float32 matrix.
+
+        The matrix is cached per embeddings list, so the retry loop pays the
+        stacking cost only once per generation run.
+        """
+        import numpy as np
+
+        if self._cached_source is not recent_embeddings:
+            matrix = np.asarray([e for _, e in recent_embeddings], dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._cached_matrix = matrix
+            self._cached_source = recent_embeddings
+        return self._cached_matrix
 
     def check_similarity_threshold(
         self,
         message: str,
-        recent_embeddings: List[Tuple[str, List[float]]],
-        threshold: float = 0.85
-    ) -> Tuple[bool, float]:
+        recent_embeddings: List[Tuple[str, np.ndarray]] = None,
+        threshold: float = 0.85,
+        recent_matrix: np.ndarray = None,
+        new_embedding: np.ndarray = None
+    ) -> Tuple[bool, float, np.ndarray]:
         """
         Check if message is too similar to recent messages.
 
@@ -170,24 +267,38 @@ Generate today's message of the day following the two-part format with a blank l
             message: New message to check
             recent_embeddings: List of (content, embedding) tuples from recent messages
             threshold: Similarity threshold (0-1). Default 0.85 means reject if >85% similar
+            recent_matrix: Optional pre-normalized (N, d) embedding matrix
+                (e.g. from MessageDatabase.get_embedding_matrix); takes
+                precedence over recent_embeddings
+            new_embedding: Optional precomputed embedding for message (unit-norm
+                float32, as returned by get_embedding), to avoid a redundant
+                API round trip
 
         Returns:
-            Tuple of (is_too_similar, max_similarity_score)
+            Tuple of (is_too_similar, max_similarity_score, new_embedding).
+            The embedding is returned so callers can store it without a
+            second API round trip.
         """
-        if not recent_embeddings:
-            return False, 0.0
+        if recent_matrix is not None:
+            matrix = recent_matrix
+        elif recent_embeddings:
+            matrix = self._build_matrix(recent_embeddings)
+        else:
+            matrix = None
+
+        # get_embedding returns unit-norm float32 ndarrays, so the candidate
+        # needs no conversion or re-normalization here
+        if new_embedding is None:
+            new_embedding = self.get_embedding(message)
 
-        # Get embedding for new message
-        new_embedding = self.get_embedding(message)
+        if matrix is None or matrix.size == 0:
+            return False, 0.0, new_embedding
 
-        # Calculate similarity to all recent messages
-        max_similarity = 0.0
-        for content, embedding in recent_embeddings:
-            similarity = self.cosine_similarity(new_embedding, embedding)
-            max_similarity = max(max_similarity, similarity)
+        # Single matrix-vector product against all recent messages
+        max_similarity = _max_cosine(matrix, new_embedding)
 
         is_too_similar = max_similarity > threshold
-        return is_too_similar, max_similarity
+        return is_too_similar, max_similarity, new_embedding
 
     def validate_message(self, message: str, min_length: int = 50, max_length: int = 800) -> bool:
         """
@@ -208,50 +319,50 @@ Generate today's message of the day following the two-part format with a blank l
             print(f"Message length {len(message)} outside range {min_length}-{max_length}")
             return False
 
-        # Check that message has some substance
-        if message.count('.') < 2:  # At least 2 sentences
+        # Check that message has some substance (at least 2 sentences);
+        # two early-exit finds instead of counting every period
+        first_period = message.find('.')
+        if first_period == -1 or message.find('.', first_period + 1) == -1:
             print("Message has fewer than 2 sentences")
             return False
 
-        # Check for blank line separator (double newline)
-        if '\n\n' not in message:
-            print("Message missing blank line separator between main message and thanks")
-            return False
-
-        # Check that message doesn't thank node operators
+        # Lowercase once; all remaining checks run against this copy
         lower_message = message.lower()
-        if 'node operator' in lower_message or 'pillar operator' in lower_message:
-            print("Message incorrectly thanks node operators")
-            return False
 
-        # Split into parts and validate structure
-        parts = message.split('\n\n', 1)
+        # Split into parts and validate structure (blank line separator)
+        parts = lower_message.split('\n\n', 1)
         if len(parts) != 2:
             print("Message doesn't have exactly 2 parts separated by blank line")
             return False
 
         main_message, thanks = parts
 
+        # Check that message doesn't thank node operators
+        if _FORBIDDEN_THANKS.search(lower_message):
+            print("Message incorrectly thanks node operators")
+            return False
+
         # Validate main message has content
         if len(main_message.strip()) < 30:
             print("Main message too short")
             return False
 
         # Validate thanks section exists and has content
-        thanks_lower = thanks.lower()
-        if not any(keyword in thanks_lower for keyword in ['thanks', 'thank', 'appreciation', 'respect', 'shout']):
+        if not _THANKS_KEYWORDS.search(thanks):
             print("Thanks section doesn't contain appreciation keywords")
             return False
 
         return True
 
-    def generate_with_retry(
+    async def generate_with_retry(
         self,
         previous_messages: List[str] = None,
-        recent_embeddings: List[Tuple[str, List[float]]] = None,
+        recent_embeddings: List[Tuple[str, np.ndarray]] = None,
         max_attempts: int = 3,
-        similarity_threshold: float = 0.85
-    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        similarity_threshold: float = 0.85,
+        recent_matrix: np.ndarray = None,
+        recent_hashes: set = None
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
         """
         Generate message with retry logic and similarity checking.
 
@@ -260,35 +371,62 @@ Generate today's message of the day following the two-part format with a blank l
             recent_embeddings: List of (content, embedding) tuples for similarity checking
             max_attempts: Maximum number of generation attempts
             similarity_threshold: Cosine similarity threshold (0-1). Default 0.85
+            recent_matrix: Optional pre-normalized (N, d) embedding matrix from
+                MessageDatabase.get_embedding_matrix; takes precedence over
+                recent_embeddings
+            recent_hashes: Optional set of recent content hashes (from
+                MessageDatabase.get_recent_hashes) used to reject exact
+                duplicates before paying for an embedding call
 
         Returns:
             Tuple of (generated_message, embedding) or (None, None) if all attempts fail
         """
         recent_embeddings = recent_embeddings or []
+        has_history = bool(recent_embeddings) or (recent_matrix is not None and recent_matrix.size > 0)
         best_message = None
         best_embedding = None
         best_similarity = 1.0  # Start with worst case
 
         for attempt in range(max_attempts):
             try:
-                message = self.generate_message(previous_messages)
+                message = await asyncio.to_thread(self.generate_message, previous_messages)
+
+                # Exact-duplicate short circuit: one set lookup instead of an
+                # embedding round trip when the model repeats itself verbatim
+                if recent_hashes and hash_content(message) in recent_hashes:
+                    print(f"Attempt {attempt + 1}: Exact duplicate of a recent message")
+                    continue
+
+                # Kick off the embedding request before validating: the HTTP
+                # round trip dominates, so a passing validation costs ~nothing
+                # extra and a failing one just abandons the in-flight embed
+                embed_task = asyncio.create_task(asyncio.to_thread(self.get_embedding, message))
 
-                # Basic validation
+                # Basic validation (cheap string checks, runs concurrently
+                # with the embedding call)
                 if not self.validate_message(message):
                     print(f"Attempt {attempt + 1}: Generated message failed validation")
+                    embed_task.cancel()
+                    # Retrieve any exception so the event loop doesn't warn
+                    embed_task.add_done_callback(lambda t: t.cancelled() or t.exception())
                     continue
 
+                # Embedding reused for both the similarity check and storage,
+                # so no second API round trip
+                embedding = await embed_task
+
                 # Similarity check
-                if recent_embeddings:
-                    is_too_similar, max_similarity = self.check_similarity_threshold(
-                        message, recent_embeddings, similarity_threshold
+                if has_history:
+                    is_too_similar, max_similarity, embedding = self.check_similarity_threshold(
+                        message, recent_embeddings, similarity_threshold,
+                        recent_matrix=recent_matrix, new_embedding=embedding
                     )
 
                     # Track best message even if above threshold
                     if max_similarity < best_similarity:
                         best_similarity = max_similarity
                         best_message = message
-                        best_embedding = None  # Will compute if needed
+                        best_embedding = embedding
 
                     if is_too_similar:
                         print(f"Attempt {attempt + 1}: Message too similar (similarity: {max_similarity:.2%})")
@@ -296,16 +434,12 @@ Generate today's message of the day following the two-part format with a blank l
                         # On final attempt, use best message we found
                         if attempt == max_attempts - 1 and best_message:
                             print(f"⚠️  Using best message from {max_attempts} attempts (similarity: {best_similarity:.2%})")
-                            if not best_embedding:
-                                best_embedding = self.get_embedding(best_message)
                             return best_message, best_embedding
 
                         continue
                     else:
                         print(f"✅ Similarity check passed (max similarity: {max_similarity:.2%})")
 
-                # Get embedding for storage
-                embedding = self.get_embedding(message)
                 return message, embedding
 
             except Exception as e:
@@ -316,8 +450,120 @@ Generate today's message of the day following the two-part format with a blank l
         # Fallback: If we have a best message, use it even if above threshold
         if best_message:
             print(f"⚠️  All attempts exceeded threshold. Using least similar message (similarity: {best_similarity:.2%})")
-            if not best_embedding:
-                best_embedding = self.get_embedding(best_message)
+            return best_message, best_embedding
+
+        return None, None
+
+    async def agenerate_message(self, previous_messages: List[str] = None) -> str:
+        """Async variant of generate_message, on the shared AsyncOpenAI client."""
+        previous_messages = previous_messages or []
+        user_prompt = self._build_user_prompt(previous_messages)
+
+        response = await self._get_async_client().chat.completions.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.8,
+            max_tokens=300
+        )
+        return response.choices[0].message.content.strip()
+
+    async def aget_embeddings_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Async variant of get_embeddings_batch (same normalization contract)."""
+        import numpy as np
+
+        response = await self._get_async_client().embeddings.create(
+            model="text-embedding-3-small",
+            input=texts
+        )
+        vectors = []
+        for item in response.data:
+            vector = np.asarray(item.embedding, dtype=np.float32)
+            vectors.append(vector / np.linalg.norm(vector))
+        return vectors
+
+    async def agenerate_with_retry(
+        self,
+        previous_messages: List[str] = None,
+        recent_embeddings: List[Tuple[str, np.ndarray]] = None,
+        max_attempts: int = 3,
+        similarity_threshold: float = 0.85,
+        recent_matrix: np.ndarray = None,
+        recent_hashes: set = None
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Generate candidates concurrently and keep the first acceptable one.
+
+        Same contract as generate_with_retry, but instead of serial attempts
+        it fires max_attempts chat completions at once via the AsyncOpenAI
+        client, filters them in request order (hash, validation), embeds the
+        survivors in a single batch call, and returns the lowest-index
+        candidate that passes the similarity check. Worst-case latency is one
+        completion plus one embedding round trip rather than max_attempts
+        sequential loops; token cost matches a worst-case serial run.
+
+        Returns:
+            Tuple of (generated_message, embedding) or (None, None) if all attempts fail
+        """
+        recent_embeddings = recent_embeddings or []
+        has_history = bool(recent_embeddings) or (recent_matrix is not None and recent_matrix.size > 0)
+
+        results = await asyncio.gather(
+            *(self.agenerate_message(previous_messages) for _ in range(max_attempts)),
+            return_exceptions=True
+        )
+
+        # Cheap filters first, preserving request order so earlier candidates
+        # keep priority
+        candidates = []
+        for attempt, result in enumerate(results, start=1):
+            if isinstance(result, BaseException):
+                print(f"Attempt {attempt} failed: {result}")
+                continue
+            if recent_hashes and hash_content(result) in recent_hashes:
+                print(f"Attempt {attempt}: Exact duplicate of a recent message")
+                continue
+            if not self.validate_message(result):
+                print(f"Attempt {attempt}: Generated message failed validation")
+                continue
+            candidates.append(result)
+
+        if not candidates:
+            return None, None
+
+        try:
+            embeddings = await self.aget_embeddings_batch(candidates)
+        except Exception as e:
+            print(f"Error getting embeddings for candidates: {e}")
+            return None, None
+
+        if not has_history:
+            return candidates[0], embeddings[0]
+
+        best_message = None
+        best_embedding = None
+        best_similarity = 1.0  # Start with worst case
+
+        for message, embedding in zip(candidates, embeddings):
+            is_too_similar, max_similarity, _ = self.check_similarity_threshold(
+                message, recent_embeddings, similarity_threshold,
+                recent_matrix=recent_matrix, new_embedding=embedding
+            )
+
+            if not is_too_similar:
+                print(f"✅ Similarity check passed (max similarity: {max_similarity:.2%})")
+                return message, embedding
+
+            print(f"Candidate too similar (similarity: {max_similarity:.2%})")
+            if max_similarity < best_similarity:
+                best_similarity = max_similarity
+                best_message = message
+                best_embedding = embedding
+
+        if best_message:
+            print(f"⚠️  All candidates exceeded threshold. Using least similar message (similarity: {best_similarity:.2%})")
             return best_message, best_embedding
 
         return None, None
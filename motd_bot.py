@@ -2,19 +2,31 @@
 Zenon Network Message of the Day Bot
 Generates and posts daily messages from Mr. Kaine to Telegram
 """
+from __future__ import annotations
+
 import asyncio
 import logging
+import time
 from datetime import datetime
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-import pytz
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 from config import Config
 from database import MessageDatabase
 from message_generator import MessageGenerator
 
+# Use the libuv-backed event loop when available: drop-in, ~2-4x faster on
+# socket I/O during polling bursts. Must install before any loop is created.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import Application, ContextTypes
+
 # Configure logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -23,6 +35,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _today_key(minute_bucket: int, tz_name: str) -> str:
+    """Today's date string for the given timezone.
+
+    Memoized per minute bucket, so bursts of /motd traffic don't redo the
+    timezone conversion and strftime on every request; the cache naturally
+    invalidates as the clock advances.
+    """
+    import pytz
+    return datetime.now(pytz.timezone(tz_name)).strftime('%Y-%m-%d')
+
+
+def _today() -> str:
+    """Today's date string in the configured timezone."""
+    return _today_key(int(time.time() // 60), Config.TIMEZONE)
+
+
 class MOTDBot:
     """Message of the Day bot for Telegram."""
 
@@ -49,9 +78,7 @@ class MOTDBot:
         logger.info(f"MOTD command received from {update.effective_user.id}")
 
         # Check if we already have today's message (timezone-aware)
-        tz = pytz.timezone(Config.TIMEZONE)
-        today = datetime.now(tz).strftime('%Y-%m-%d')
-        existing_message = self.db.get_message_by_date(today)
+        existing_message = self.db.get_message_by_date(_today())
 
         if existing_message:
             logger.info("Returning cached message for today")
@@ -73,8 +100,7 @@ class MOTDBot:
     async def generate_daily_message(self) -> str:
         """Generate today's message if it doesn't exist."""
         # Use timezone-aware date to match scheduler
-        tz = pytz.timezone(Config.TIMEZONE)
-        today = datetime.now(tz).strftime('%Y-%m-%d')
+        today = _today()
 
         # Check if message already exists for today
         existing_message = self.db.get_message_by_date(today)
@@ -82,21 +108,25 @@ class MOTDBot:
             logger.info("Using existing message for today")
             return existing_message
 
-        # Get recent messages for context (text only)
-        recent_messages = self.db.get_recent_messages()
+        # Get recent texts and the cached embedding matrix in one query
+        # Only 10 texts ever reach the prompt (_format_recent_messages),
+        # so cap the fetch server-side rather than materializing a year
+        recent_messages, emb_contents, emb_matrix = self.db.get_recent(
+            days_text=Config.HISTORY_DAYS,
+            days_emb=Config.SIMILARITY_CHECK_DAYS,
+            text_limit=10
+        )
         logger.info(f"Retrieved {len(recent_messages)} recent messages for context")
-
-        # Get recent embeddings for similarity checking
-        recent_embeddings = self.db.get_recent_embeddings(days=Config.SIMILARITY_CHECK_DAYS)
-        logger.info(f"Retrieved {len(recent_embeddings)} embeddings for similarity checking")
+        logger.info(f"Retrieved {len(emb_contents)} embeddings for similarity checking")
 
         # Generate new message with similarity checking
         logger.info(f"Generating new message (threshold: {Config.SIMILARITY_THRESHOLD:.2%}, max attempts: {Config.MAX_GENERATION_ATTEMPTS})...")
-        message, embedding = self.generator.generate_with_retry(
+        message, embedding = await self.generator.generate_with_retry(
             previous_messages=recent_messages,
-            recent_embeddings=recent_embeddings,
             max_attempts=Config.MAX_GENERATION_ATTEMPTS,
-            similarity_threshold=Config.SIMILARITY_THRESHOLD
+            similarity_threshold=Config.SIMILARITY_THRESHOLD,
+            recent_matrix=emb_matrix,
+            recent_hashes=self.db.get_recent_hashes(days=Config.SIMILARITY_CHECK_DAYS)
         )
 
         if not message:
@@ -141,6 +171,10 @@ class MOTDBot:
 
     def setup_scheduler(self, event_loop):
         """Set up the daily posting schedule."""
+        import pytz
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+
         self.scheduler = AsyncIOScheduler(
             timezone=pytz.timezone(Config.TIMEZONE),
             event_loop=event_loop
@@ -161,6 +195,16 @@ class MOTDBot:
             replace_existing=True
         )
 
+        # Weekly VACUUM to reclaim pages freed by cleanup_old_messages;
+        # too expensive to run on every daily post
+        self.scheduler.add_job(
+            self.db.vacuum,
+            trigger=CronTrigger(day_of_week='sun', hour=3, minute=0, timezone=Config.TIMEZONE),
+            id='weekly_vacuum',
+            name='Weekly database VACUUM',
+            replace_existing=True
+        )
+
         logger.info(
             f"Scheduled daily posts at {Config.DAILY_POST_HOUR:02d}:{Config.DAILY_POST_MINUTE:02d} {Config.TIMEZONE}"
         )
@@ -172,6 +216,9 @@ class MOTDBot:
 
     def run(self):
         """Run the bot."""
+        from telegram import Update
+        from telegram.ext import Application, CommandHandler
+
         logger.info("Starting Zenon MOTD Bot...")
 
         # Create application
@@ -2,22 +2,54 @@
 Local testing script for MOTD bot.
 Test message generation without posting to Telegram.
 """
+from __future__ import annotations
+
 import asyncio
+import atexit
 import sys
+import time
 from datetime import datetime
+from typing import TYPE_CHECKING
 from config import Config
-from database import MessageDatabase
-from message_generator import MessageGenerator
+
+if TYPE_CHECKING:
+    from database import MessageDatabase
+    from message_generator import MessageGenerator
+
+# Shared instances so `all` doesn't pay SQLite connect + pragma setup and
+# OpenAI client init once per test function
+_DB = None
+_GEN = None
+
+
+def _get_db() -> MessageDatabase:
+    """Lazily-created MessageDatabase shared across test functions."""
+    global _DB
+    if _DB is None:
+        # Imported here so `python test_motd.py config` never pays the
+        # sqlite/numpy import cost
+        from database import MessageDatabase
+        _DB = MessageDatabase()
+        atexit.register(_DB.close)
+    return _DB
+
+
+def _get_generator() -> MessageGenerator:
+    """Lazily-created MessageGenerator shared across test functions."""
+    global _GEN
+    if _GEN is None:
+        from message_generator import MessageGenerator
+        _GEN = MessageGenerator()
+    return _GEN
 
 
 def print_header(text: str):
-    """Print a formatted header."""
-    print("\n" + "=" * 60)
-    print(f" {text}")
-    print("=" * 60 + "\n")
+    """Print a formatted header with a single buffered write."""
+    bar = "=" * 60
+    sys.stdout.write(f"\n{bar}\n {text}\n{bar}\n\n")
 
 
-def test_config():
+async def test_config():
     """Test configuration loading."""
     print_header("Testing Configuration")
 
@@ -38,17 +70,19 @@ def test_config():
         return False
 
 
-def test_database():
+async def test_database():
     """Test database operations."""
     print_header("Testing Database")
 
     try:
-        db = MessageDatabase()
-        count = db.get_message_count()
+        # Blocking SQLite work runs in a thread so it can overlap the
+        # config test when both are gathered
+        db = await asyncio.to_thread(_get_db)
+        count = await asyncio.to_thread(db.get_message_count)
         print(f"Total messages in database: {count}")
 
         # Test today's message
-        today_msg = db.get_today_message()
+        today_msg = await asyncio.to_thread(db.get_today_message)
         if today_msg:
             print(f"\n✅ Found existing message for today:")
             print(f"{today_msg[:200]}...")
@@ -56,10 +90,9 @@ def test_database():
             print("\nℹ️  No message exists for today yet")
 
         # Test recent messages
-        recent = db.get_recent_messages(days=7)
+        recent = await asyncio.to_thread(db.get_recent_messages, 7)
         print(f"\nMessages in last 7 days: {len(recent)}")
 
-        db.close()
         print("\n✅ Database tests passed")
         return True
     except Exception as e:
@@ -67,33 +100,33 @@ def test_database():
         return False
 
 
-def test_message_generation():
+async def test_message_generation():
     """Test message generation."""
     print_header("Testing Message Generation")
 
     try:
         # Initialize components
-        db = MessageDatabase()
-        generator = MessageGenerator()
+        db = _get_db()
+        generator = _get_generator()
 
         # Get recent messages for context
         recent_messages = db.get_recent_messages(days=30)
         print(f"Using {len(recent_messages)} recent messages for context")
 
-        # Get recent embeddings for similarity checking
-        from config import Config
-        recent_embeddings = db.get_recent_embeddings(days=Config.SIMILARITY_CHECK_DAYS)
-        print(f"Retrieved {len(recent_embeddings)} embeddings for similarity checking")
+        # Get the pre-normalized embedding matrix for similarity checking,
+        # so the generator's check is a single matrix-vector product
+        emb_contents, emb_matrix = db.get_embedding_matrix(days=Config.SIMILARITY_CHECK_DAYS)
+        print(f"Retrieved {len(emb_contents)} embeddings for similarity checking")
         print(f"Similarity threshold: {Config.SIMILARITY_THRESHOLD:.2%}")
         print(f"Max attempts: {Config.MAX_GENERATION_ATTEMPTS}\n")
 
-        # Generate message
+        # Generate message (candidates are requested concurrently)
         print("Generating new message (this may take a few seconds)...\n")
-        message, embedding = generator.generate_with_retry(
+        message, embedding = await generator.agenerate_with_retry(
             previous_messages=recent_messages,
-            recent_embeddings=recent_embeddings,
             max_attempts=Config.MAX_GENERATION_ATTEMPTS,
-            similarity_threshold=Config.SIMILARITY_THRESHOLD
+            similarity_threshold=Config.SIMILARITY_THRESHOLD,
+            recent_matrix=emb_matrix
         )
 
         if message:
@@ -114,11 +147,9 @@ def test_message_generation():
             print("\nℹ️  Note: Message NOT saved to database (this is a read-only test)")
             print("   To save a message, run: python test_motd.py save")
 
-            db.close()
             return True
         else:
             print("❌ Failed to generate message")
-            db.close()
             return False
 
     except Exception as e:
@@ -128,17 +159,19 @@ def test_message_generation():
         return False
 
 
-def test_save_message():
+async def test_save_message():
     """Test saving a message to database."""
     print_header("Testing Message Save")
 
     try:
-        db = MessageDatabase()
-        generator = MessageGenerator()
+        db = _get_db()
+        generator = _get_generator()
 
-        # Check for existing message
-        today = datetime.now().strftime('%Y-%m-%d')
-        existing = db.get_message_by_date(today)
+        # Compute today's date once, timezone-aware so it matches what the
+        # bot's scheduler would use, and thread it through the lookups below
+        import pytz
+        today = datetime.now(pytz.timezone(Config.TIMEZONE)).strftime('%Y-%m-%d')
+        existing = db.get_today_message(today)
 
         if existing:
             print(f"ℹ️  Message already exists for {today}")
@@ -146,19 +179,17 @@ def test_save_message():
             response = input().strip().lower()
             if response != 'y':
                 print("Skipping message generation")
-                db.close()
                 return True
 
         # Generate and save
-        from config import Config
         recent_messages = db.get_recent_messages()
-        recent_embeddings = db.get_recent_embeddings(days=Config.SIMILARITY_CHECK_DAYS)
-        print(f"\nGenerating message (checking against {len(recent_embeddings)} recent embeddings)...")
-        message, embedding = generator.generate_with_retry(
+        emb_contents, emb_matrix = db.get_embedding_matrix(days=Config.SIMILARITY_CHECK_DAYS)
+        print(f"\nGenerating message (checking against {len(emb_contents)} recent embeddings)...")
+        message, embedding = await generator.agenerate_with_retry(
             previous_messages=recent_messages,
-            recent_embeddings=recent_embeddings,
             max_attempts=Config.MAX_GENERATION_ATTEMPTS,
-            similarity_threshold=Config.SIMILARITY_THRESHOLD
+            similarity_threshold=Config.SIMILARITY_THRESHOLD,
+            recent_matrix=emb_matrix
         )
 
         if message:
@@ -174,11 +205,9 @@ def test_save_message():
             else:
                 print("❌ Failed to save message")
 
-            db.close()
             return saved
         else:
             print("❌ Failed to generate message")
-            db.close()
             return False
 
     except Exception as e:
@@ -186,59 +215,101 @@ def test_save_message():
         return False
 
 
-def run_all_tests():
-    """Run all tests."""
-    print("\n" + "🚀 " * 20)
-    print("ZENON NETWORK MOTD BOT - TEST SUITE")
-    print("🚀 " * 20)
+# Suite registry: run_all_tests walks this instead of hardcoding calls,
+# so adding a test is a one-line change
+TESTS = [
+    ('Configuration', test_config),
+    ('Database', test_database),
+    ('Message Generation', test_message_generation),
+]
 
-    results = {
-        'Configuration': test_config(),
-        'Database': test_database(),
-    }
 
-    # Only run generation tests if basic tests pass
-    if all(results.values()):
-        results['Message Generation'] = test_message_generation()
+async def _safe_run(test_fn) -> tuple:
+    """Run one test coroutine, timing it and containing any escape.
 
-    # Summary
-    print_header("Test Summary")
-    for test_name, passed in results.items():
-        status = "✅ PASSED" if passed else "❌ FAILED"
-        print(f"{test_name}: {status}")
+    Catches BaseException rather than Exception so a Ctrl+C (or SystemExit
+    from deep inside a client library) mid-test still yields a summary for
+    the tests that did run. perf_counter_ns avoids the float conversion on
+    the hot path; the summary formats it once.
 
-    all_passed = all(results.values())
-    print(f"\nOverall: {'✅ ALL TESTS PASSED' if all_passed else '❌ SOME TESTS FAILED'}")
+    Returns:
+        Tuple of (passed, elapsed_ns)
+    """
+    start = time.perf_counter_ns()
+    try:
+        passed = bool(await test_fn())
+    except BaseException as e:
+        print(f"\n❌ {type(e).__name__}: {e}")
+        passed = False
+    return passed, time.perf_counter_ns() - start
+
+
+async def run_all_tests():
+    """Run all tests."""
+    banner = "🚀 " * 20
+    sys.stdout.write(f"\n{banner}\nZENON NETWORK MOTD BOT - TEST SUITE\n{banner}\n")
+
+    # Sequential with fail-fast: each test depends on the previous layer
+    # (database needs valid config, generation needs both), so stopping at
+    # the first failure skips work that could only fail for the same root
+    # cause — a broken config never pays the SQLite open or API round trips
+    results = {}
+    all_passed = True
+    for name, fn in TESTS:
+        passed, elapsed_ns = await _safe_run(fn)
+        results[name] = (passed, elapsed_ns)
+        if not passed:
+            all_passed = False
+            break
+
+    # Summary with per-test wall clock, emitted as one buffered write
+    print_header("Test Summary")
+    lines = [
+        f"{test_name}: {'✅ PASSED' if passed else '❌ FAILED'} ({elapsed_ns / 1e9:.2f}s)"
+        for test_name, (passed, elapsed_ns) in results.items()
+    ]
+    skipped = len(TESTS) - len(results)
+    if skipped:
+        lines.append(f"\n⏭️  Skipped {skipped} test(s) after first failure")
+    lines.append(f"\nOverall: {'✅ ALL TESTS PASSED' if all_passed else '❌ SOME TESTS FAILED'}")
+    sys.stdout.write("\n".join(lines) + "\n")
 
     return all_passed
 
 
-def main():
+async def main_async():
     """Main test entry point."""
     if len(sys.argv) > 1:
         test_type = sys.argv[1].lower()
 
         if test_type == 'config':
-            test_config()
+            await test_config()
         elif test_type == 'database':
-            test_database()
+            await test_database()
         elif test_type == 'generate':
-            test_message_generation()
+            await test_message_generation()
         elif test_type == 'save':
-            test_save_message()
+            await test_save_message()
         elif test_type == 'all':
-            run_all_tests()
+            await run_all_tests()
         else:
-            print(f"Unknown test type: {test_type}")
-            print("\nAvailable tests:")
-            print("  python test_motd.py config    - Test configuration")
-            print("  python test_motd.py database  - Test database")
-            print("  python test_motd.py generate  - Test message generation")
-            print("  python test_motd.py save      - Generate and save today's message")
-            print("  python test_motd.py all       - Run all tests")
+            sys.stdout.write(
+                f"Unknown test type: {test_type}\n"
+                "\nAvailable tests:\n"
+                "  python test_motd.py config    - Test configuration\n"
+                "  python test_motd.py database  - Test database\n"
+                "  python test_motd.py generate  - Test message generation\n"
+                "  python test_motd.py save      - Generate and save today's message\n"
+                "  python test_motd.py all       - Run all tests\n"
+            )
     else:
         # Default: run all tests
-        run_all_tests()
+        await run_all_tests()
+
+
+def main():
+    """Synchronous wrapper around the async entry point."""
+    asyncio.run(main_async())
 
 
 if __name__ == '__main__':